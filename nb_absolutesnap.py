@@ -12,6 +12,15 @@ bl_info = {
 
 import bpy
 import math
+import os
+import struct
+import tempfile
+import time
+import zlib
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bpy.app.handlers import persistent
 from mathutils import Matrix
 
 
@@ -19,6 +28,20 @@ NB_matrix = [] # For storing the target's world matrix when copying
 NB_relative = [] # For storing the relationship between two objects
 NB_current_constraint = '' # For storing the current edited constraint, right now just for the right click menu
 NB_eval_message = '' # For the evaluation error message
+NB_library = None # The memory-mapped transform library and the file state it was mapped from
+NB_library_items = [] # For keeping the library search items alive while Blender shows them
+NB_bake_chunk = 64 # Frames evaluated on the main thread before they're handed to a solver thread
+NB_bake_workers = max(1, min(4, (os.cpu_count() or 2) - 1)) # Solver threads used while baking
+NB_bake_fingerprints = {} # Per (parent, child), the frames, relationship, source channels and baked keys of the last relative bake
+NB_rebake_tolerance = 0.0001 # How far a source channel may move before its frame is baked again
+NB_sticky = {} # Pinned items by owner key, with their pinned world matrix and what they hung off when last checked
+NB_sticky_queue = deque() # Pinned items still to check in the current sticky update
+NB_sticky_busy = False # Guards against our own snapping triggering another sticky update
+NB_sticky_budget = 0.004 # Seconds a sticky update may spend before leaving the rest for later
+NB_audit = {} # Unsafe Child Of constraints by object key: {bone name or '': [(constraint name, reason)]}
+NB_audit_dirty = set() # Keys of objects changed since their last audit
+NB_audit_ready = False # Whether the whole file has been audited since it was loaded
+NB_audit_lines = 30 # Unsafe constraints listed in the audit popup
 
 ##### Functions #####
 
@@ -77,6 +100,27 @@ def get_obj(context):
         obj = context.active_pose_bone
     return obj
 
+# Return why the constraint can't be evaluated safely, or an empty string if it can
+def constraint_issue(con, check_influence=True):
+    
+    channels = [con.use_location_x, con.use_location_y, con.use_location_z,
+                con.use_rotation_x, con.use_rotation_y, con.use_rotation_z]
+    im = con.inverse_matrix.copy()
+    t1, r1, sc1 = Matrix.decompose(im)
+    valid_scale = True
+    for axis in sc1:
+        if not math.isclose(sc1.x, axis, abs_tol=0.00001):
+            valid_scale = False
+    influence = con.influence
+    
+    if not valid_scale:
+        return 'Inverse scale not equal'
+    elif check_influence and (influence != 1 and influence != 0):
+        return 'Influence is not 0 or 1'
+    elif any(channels) and not all(channels):
+        return 'Loc/Rot channels disabled'
+    return ''
+
 # Return lists containing all the safely evaluated constraints, and all the influences
 def get_channels(obj):
     
@@ -86,26 +130,13 @@ def get_channels(obj):
     
     for con in obj.constraints:
         if valid_constraint(con):
-            channels = [con.use_location_x, con.use_location_y, con.use_location_z,
-                        con.use_rotation_x, con.use_rotation_y, con.use_rotation_z]
-            im = con.inverse_matrix.copy()
-            t1, r1, sc1 = Matrix.decompose(im)
-            valid_scale = True
-            for axis in sc1:
-                if not math.isclose(sc1.x, axis, abs_tol=0.00001):
-                    valid_scale = False
-            influence = con.influence
-            if (influence != 1 and influence != 0) or (any(channels) and not all(channels)) or not valid_scale:
+            issue = constraint_issue(con)
+            if issue:
                 safe_constraints.append(False)
-                if not valid_scale:
-                    NB_eval_message = 'Inverse scale not equal'
-                elif (influence != 1 and influence != 0):
-                    NB_eval_message = 'Influence is not 0 or 1'
-                else:
-                    NB_eval_message = 'Loc/Rot channels disabled'
+                NB_eval_message = issue
             else:
                 safe_constraints.append(True)
-            influences.append(influence)
+            influences.append(con.influence)
 
             
     return safe_constraints, influences
@@ -115,11 +146,112 @@ def get_channels(obj):
 def get_matrix(context, object):
     
     if object_in_posemode(object):
-        matrix = object.matrix_world.copy() @ context.active_pose_bone.matrix.copy()
+        matrix = world_matrix(context.active_pose_bone)
     else:
-        matrix = object.matrix_world.copy()
+        matrix = world_matrix(object)
     return matrix
 
+# Evaluate the world matrix of an object or pose bone as it is right now
+def world_matrix(owner):
+    if isinstance(owner, bpy.types.PoseBone):
+        return owner.id_data.matrix_world @ owner.matrix
+    return owner.matrix_world.copy()
+
+# Return the key bpy.data.objects looks an object up by: its name and the path of the library it's linked
+# from, so a linked object and a local one with the same name are told apart
+def object_key(obj):
+    return (obj.name, obj.library.filepath if obj.library else None)
+
+# Return a hashable key that identifies an object or pose bone across operator calls
+def owner_key(owner):
+    if isinstance(owner, bpy.types.PoseBone):
+        return (object_key(owner.id_data), owner.name)
+    return (object_key(owner), '')
+
+# Return the owner followed by every bone and object its world matrix inherits from
+def owner_chain(owner):
+    chain = []
+    if isinstance(owner, bpy.types.PoseBone):
+        chain.append(owner)
+        chain.extend(owner.parent_recursive)
+        owner = owner.id_data
+    while owner is not None:
+        chain.append(owner)
+        parent = owner.parent
+        if parent is not None and owner.parent_type == 'BONE' and parent.pose:
+            bone = parent.pose.bones.get(owner.parent_bone)
+            if bone is not None:
+                chain.append(bone)
+                chain.extend(bone.parent_recursive)
+        owner = parent
+    return chain
+
+# Return the F-Curves animating the transforms and constraints of the given chain of objects and bones,
+# the (owner, path, index) channels they animate and the actions they come from
+def chain_fcurves(chain):
+    
+    fcurves = []
+    animated = set()
+    actions = []
+    
+    ids = []
+    for item in chain:
+        if item.id_data not in ids:
+            ids.append(item.id_data)
+    
+    for id_data in ids:
+        names = {item.name for item in chain if item.id_data == id_data and isinstance(item, bpy.types.PoseBone)}
+        objects = any(item == id_data for item in chain)
+        action = id_data.animation_data.action if id_data.animation_data else None
+        if action is None:
+            continue
+        actions.append((id_data.name_full, action.name_full))
+        for fcurve in get_action_fcurves(action):
+            path = fcurve.data_path
+            if path.startswith('pose.bones["'):
+                bone_name = path[12:path.find('"]')]
+                if bone_name not in names:
+                    continue
+                animated.add((object_key(id_data), bone_name, path[path.find('"]') + 3:], fcurve.array_index))
+            elif objects:
+                animated.add((object_key(id_data), '', path, fcurve.array_index))
+            else:
+                continue
+            fcurves.append(fcurve)
+            
+    return fcurves, animated, actions
+
+# Return a signature of the parts of the chain that aren't animated: transforms and constraint settings
+def static_signature(chain, animated):
+    
+    signature = []
+    
+    for item in chain:
+        key = owner_key(item)
+        signature.append((key, item.rotation_mode))
+        for path in ('location', 'rotation_euler', 'rotation_quaternion', 'rotation_axis_angle', 'scale'):
+            for index, value in enumerate(getattr(item, path)):
+                if (*key, path, index) not in animated:
+                    signature.append(round(value, 6))
+        for con in item.constraints:
+            target = getattr(con, 'target', None)
+            inverse = getattr(con, 'inverse_matrix', None)
+            signature.append((con.name, con.type, con.enabled,
+                              target.name_full if target else '',
+                              getattr(con, 'subtarget', ''),
+                              tuple(value for row in inverse for value in row) if inverse else ()))
+            if (*key, f'constraints["{con.name}"].influence', 0) not in animated:
+                signature.append(round(con.influence, 6))
+    
+    return tuple(signature)
+
+# Module state refers to the data of the file that was open, so drop it when another one is loaded
+@persistent
+def load_handler(dummy):
+    NB_bake_fingerprints.clear()
+    sticky_clear()
+    audit_reset()
+
 # Return the correct items for valid multiple selection usage
 # We want to perform functions only on the ones the user intends
 def get_selection(context):
@@ -278,28 +410,25 @@ def apply_snap(matrices, matrix, object, armature, bone):
             object.matrix_world = matrix
             #print('object no constraint')
       
+# Return the rotation property keyed for the owner's rotation mode
+def rotation_path(owner):
+    rot_mode = owner.rotation_mode
+    if rot_mode == 'QUATERNION':
+        return 'rotation_quaternion'
+    elif rot_mode == 'AXIS_ANGLE':
+        return 'rotation_axis_angle'
+    return 'rotation_euler'
+
 # Set keys on all channels except for scale        
 def key_object(obj):
-    rot_mode = obj.rotation_mode
     obj.keyframe_insert(data_path='location')
-    if rot_mode == 'QUATERNION':
-        obj.keyframe_insert(data_path='rotation_quaternion')
-    elif rot_mode == 'AXIS_ANGLE':
-        obj.keyframe_insert(data_path='rotation_axis_angle')
-    else:
-        obj.keyframe_insert(data_path='rotation_euler')
+    obj.keyframe_insert(data_path=rotation_path(obj))
     #obj.keyframe_insert(data_path='scale')
 
 # Remove keys on all channels except for scale
 def unkey_object(obj):
-    rot_mode = obj.rotation_mode
     obj.keyframe_delete(data_path='location')
-    if rot_mode == 'QUATERNION':
-        obj.keyframe_delete(data_path='rotation_quaternion')
-    elif rot_mode == 'AXIS_ANGLE':
-        obj.keyframe_delete(data_path='rotation_axis_angle')
-    else:
-        obj.keyframe_delete(data_path='rotation_euler')
+    obj.keyframe_delete(data_path=rotation_path(obj))
     #obj.keyframe_delete(data_path='scale')
     
 # Redraw a few areas when called in order for keyframe related UI to be up to date
@@ -309,6 +438,1244 @@ def refresh_anim():
             area.tag_redraw()
 
 
+##### Baking #####
+
+# Multiply Child Of compensation matrices together the way apply_snap does
+def combine_matrices(matrices):
+    result = matrices[0]
+    for m in matrices[1:]:
+        result = result @ m
+    return result
+
+# Return true if the bone's local space is a plain matrix product of its parent's pose,
+# which is what lets us convert pose matrices to keys without going through bpy
+def full_inherit(pose_bone):
+    bone = pose_bone.bone
+    return bone.use_inherit_rotation and bone.use_local_location and getattr(bone, 'inherit_scale', 'FULL') == 'FULL'
+
+# Return the matrix taking a pose space matrix of the bone into its local (basis) space
+def pose_to_local(pose_bone, parent_pose=None):
+    rest = pose_bone.bone.matrix_local
+    parent = pose_bone.parent
+    if parent is None:
+        return rest.inverted()
+    if parent_pose is None:
+        parent_pose = parent.matrix
+    return (parent_pose @ parent.bone.matrix_local.inverted() @ rest).inverted()
+
+# Return the world matrix an object's basis is relative to, its parent matrix times the parent inverse
+def parent_matrix(obj):
+    parent = obj.parent
+    if parent is None:
+        return Matrix.Identity(4)
+    matrix = parent.matrix_world.copy()
+    if obj.parent_type == 'BONE' and parent.pose:
+        bone = parent.pose.bones.get(obj.parent_bone)
+        if bone is not None:
+            matrix = matrix @ bone.matrix @ Matrix.Translation((0.0, bone.length, 0.0))
+    return matrix @ obj.matrix_parent_inverse
+
+# Gather everything apply_snap reads from the owner at the current frame, so the snap itself can be
+# solved later without bpy. Returns the matrix taking the world target into the solve space, the
+# scale the result is rebuilt with, and the matrix taking that result into the owner's basis.
+# Without constraints it's solved the way apply_snap does for owners with no active Child Of
+def snap_spaces(owner, armature, bone, use_constraints=True):
+    
+    matrices = calculate_childof(owner) if use_constraints else []
+    identity = Matrix.Identity(4)
+    
+    if matrices:
+        pre = combine_matrices(matrices)
+        if bone:
+            scale = owner.scale.copy()
+            post = pose_to_local(owner)
+        else:
+            scale = owner.matrix_basis.to_scale()
+            post = identity
+    else:
+        if bone:
+            pre = armature.matrix_world.inverted()
+            scale = owner.scale.copy()
+            post = pose_to_local(owner)
+        else:
+            pre = identity
+            scale = owner.matrix_world.to_scale()
+            post = parent_matrix(owner).inverted()
+            
+    return pre, scale, post
+
+# Split an (n, 4, 4) array of matrices into locations, rotation matrices and scales like Matrix.decompose
+def decompose_track(matrices):
+    loc = matrices[:, :3, 3].copy()
+    m3 = matrices[:, :3, :3]
+    size = np.linalg.norm(m3, axis=1)
+    size[np.linalg.det(m3) < 0.0] *= -1.0
+    size[size == 0.0] = 1.0
+    return loc, m3 / size[:, np.newaxis, :], size
+
+# Build an (n, 4, 4) array of matrices from locations, rotation matrices and scales like Matrix.LocRotScale
+def compose_track(loc, rot, scale):
+    matrices = np.zeros((len(loc), 4, 4))
+    matrices[:, :3, :3] = rot * scale[:, np.newaxis, :]
+    matrices[:, :3, 3] = loc
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+# Convert an array of rotation matrices into unit quaternions (w, x, y, z)
+def quaternion_track(rot):
+    
+    m = rot
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    case = np.argmax(np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1), axis=1)
+    quat = np.empty((len(rot), 4))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.sqrt(np.maximum(1.0 + trace, 0.0)) * 2.0
+        candidate = np.stack([s / 4.0, (m[:, 2, 1] - m[:, 1, 2]) / s, (m[:, 0, 2] - m[:, 2, 0]) / s, (m[:, 1, 0] - m[:, 0, 1]) / s], axis=1)
+        quat[case == 0] = candidate[case == 0]
+        s = np.sqrt(np.maximum(1.0 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2], 0.0)) * 2.0
+        candidate = np.stack([(m[:, 2, 1] - m[:, 1, 2]) / s, s / 4.0, (m[:, 0, 1] + m[:, 1, 0]) / s, (m[:, 0, 2] + m[:, 2, 0]) / s], axis=1)
+        quat[case == 1] = candidate[case == 1]
+        s = np.sqrt(np.maximum(1.0 + m[:, 1, 1] - m[:, 0, 0] - m[:, 2, 2], 0.0)) * 2.0
+        candidate = np.stack([(m[:, 0, 2] - m[:, 2, 0]) / s, (m[:, 0, 1] + m[:, 1, 0]) / s, s / 4.0, (m[:, 1, 2] + m[:, 2, 1]) / s], axis=1)
+        quat[case == 2] = candidate[case == 2]
+        s = np.sqrt(np.maximum(1.0 + m[:, 2, 2] - m[:, 0, 0] - m[:, 1, 1], 0.0)) * 2.0
+        candidate = np.stack([(m[:, 1, 0] - m[:, 0, 1]) / s, (m[:, 0, 2] + m[:, 2, 0]) / s, (m[:, 1, 2] + m[:, 2, 1]) / s, s / 4.0], axis=1)
+        quat[case == 3] = candidate[case == 3]
+    
+    quat /= np.linalg.norm(quat, axis=1)[:, np.newaxis]
+    quat[quat[:, 0] < 0.0] *= -1.0
+    return quat
+
+# Convert an array of unit quaternions back into rotation matrices
+def rotation_from_quaternions(quat):
+    w, x, y, z = quat[:, 0], quat[:, 1], quat[:, 2], quat[:, 3]
+    return np.stack([
+        np.stack([1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)], axis=1),
+        np.stack([2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)], axis=1),
+        np.stack([2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)], axis=1),
+    ], axis=1)
+
+# Return both Euler solutions of the given order for an array of rotation matrices, like Matrix.to_euler
+# finds them before picking one. Away from gimbal lock every rotation has two, equal in gimbal lock
+def euler_solutions(rot, order):
+    
+    i, j, k = ('XYZ'.index(axis) for axis in order)
+    parity = order in {'XZY', 'YXZ', 'ZYX'}
+    
+    # Blender reads its matrices column first, so mat[a][b] there is rot[:, b, a] here
+    cy = np.hypot(rot[:, i, i], rot[:, j, i])
+    first = np.empty((len(rot), 3))
+    first[:, i] = np.arctan2(rot[:, k, j], rot[:, k, k])
+    first[:, j] = np.arctan2(-rot[:, k, i], cy)
+    first[:, k] = np.arctan2(rot[:, j, i], rot[:, i, i])
+    second = np.empty((len(rot), 3))
+    second[:, i] = np.arctan2(-rot[:, k, j], -rot[:, k, k])
+    second[:, j] = np.arctan2(-rot[:, k, i], -cy)
+    second[:, k] = np.arctan2(-rot[:, j, i], -rot[:, i, i])
+    
+    gimbal = cy <= 16.0 * np.finfo(np.float32).eps
+    first[gimbal, i] = np.arctan2(-rot[gimbal, j, k], rot[gimbal, j, j])
+    first[gimbal, k] = 0.0
+    second[gimbal] = first[gimbal]
+    
+    if parity:
+        first *= -1.0
+        second *= -1.0
+    return first, second
+
+# Return the summed angular distance between Euler rotations, ignoring whole turns
+def euler_distance(a, b):
+    return np.abs((a - b + math.pi) % (2.0 * math.pi) - math.pi).sum(axis=-1)
+
+# Convert an array of rotation matrices into continuous Euler angles of the given order. Each frame takes
+# the solution that carries on from the one before and whole turns are unwrapped, so there are no flips.
+# A single reference rotation seeds the track, one reference per frame matches each frame to its own instead
+def euler_track(rot, order, reference=None):
+    
+    first, second = euler_solutions(rot, order)
+    
+    if reference is not None and reference.ndim == 2:
+        euler = np.where((euler_distance(second, reference) < euler_distance(first, reference))[:, np.newaxis], second, first)
+        return reference + ((euler - reference + math.pi) % (2.0 * math.pi) - math.pi)
+    
+    # Whether each frame's first solution carries on from the first solution of the frame before,
+    # if not the track switches solution there
+    switch = euler_distance(first[1:], first[:-1]) > euler_distance(second[1:], first[:-1])
+    start = reference is not None and euler_distance(second[0], reference) < euler_distance(first[0], reference)
+    use_second = (np.concatenate([[int(start)], switch.astype(int)]).cumsum() % 2).astype(bool)
+    euler = np.where(use_second[:, np.newaxis], second, first)
+    
+    if reference is not None:
+        return np.unwrap(np.concatenate([[reference], euler]), axis=0)[1:]
+    return np.unwrap(euler, axis=0)
+
+# Flip quaternions onto the hemisphere of the one before them, so no key turns the long way round.
+# A single reference quaternion seeds the track, one reference per frame matches each frame to its own instead
+def quaternion_continuity(quat, reference=None):
+    
+    if reference is not None and reference.ndim == 2:
+        return np.where((np.sum(quat * reference, axis=1) < 0.0)[:, np.newaxis], -quat, quat)
+    
+    flips = np.where(np.sum(quat[1:] * quat[:-1], axis=1) < 0.0, -1.0, 1.0)
+    signs = np.concatenate([[1.0], np.cumprod(flips)])
+    if reference is not None and np.dot(quat[0], reference) < 0.0:
+        signs *= -1.0
+    return quat * signs[:, np.newaxis]
+
+# Convert a whole track of solved rotation matrices into the values keyed for the given rotation mode
+# in one go, keeping it continuous across frames and with the reference rotation(s) in that mode
+def rotation_values(rot, rotation_mode, reference=None):
+    
+    if reference is not None:
+        reference = np.asarray(reference, dtype=np.float64)
+    
+    if rotation_mode == 'QUATERNION':
+        return quaternion_continuity(quaternion_track(rot), reference)
+    
+    if rotation_mode == 'AXIS_ANGLE':
+        if reference is not None:
+            half = reference[..., :1] / 2.0
+            axis = reference[..., 1:]
+            length = np.linalg.norm(axis, axis=-1, keepdims=True)
+            axis = np.divide(axis, length, out=np.tile([0.0, 1.0, 0.0], axis.shape[:-1] + (1,)), where=length > 0.0)
+            reference = np.concatenate([np.cos(half), axis * np.sin(half)], axis=-1)
+        quat = quaternion_continuity(quaternion_track(rot), reference)
+        angle = 2.0 * np.arccos(np.clip(quat[:, 0], -1.0, 1.0))
+        sine = np.sqrt(np.maximum(1.0 - quat[:, 0] ** 2, 0.0))
+        axis = np.tile([0.0, 1.0, 0.0], (len(quat), 1))
+        valid = sine > 0.0005
+        axis[valid] = quat[valid, 1:] / sine[valid, np.newaxis]
+        return np.column_stack([angle, axis])
+    
+    return euler_track(rot, rotation_mode, reference)
+
+# Solve a chunk of frames, runs on a worker thread and only touches NumPy arrays.
+# Mirrors apply_snap: bring the world target into the solve space, rebuild it with the owner's
+# scale and take it into the owner's basis. Returns locations and rotation matrices, the rotations
+# are converted to the owner's rotation mode for the whole track at once by rotation_values
+def solve_chunk(world, relative, pre, scale, post):
+    target = pre @ (world @ relative)
+    loc, rot, size = decompose_track(target)
+    rot = rotation_from_quaternions(quaternion_track(rot))
+    basis = post @ compose_track(loc, rot, scale)
+    loc, rot, size = decompose_track(basis)
+    return loc, rot
+
+# Return the F-Curve for the data path and index on the owner's action, creating the action if needed
+def ensure_fcurve(id_data, data_path, index, group):
+    
+    anim = id_data.animation_data or id_data.animation_data_create()
+    if anim.action is None:
+        anim.action = bpy.data.actions.new(name=f'{id_data.name}Action')
+    action = anim.action
+    
+    # Blender 4.4+ layered actions, also takes care of the slot, layer and strip
+    ensure = getattr(action, 'fcurve_ensure_for_datablock', None)
+    if ensure is not None:
+        return ensure(id_data, data_path, index=index, group_name=group)
+    
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    return fcurve
+
+# Write a whole track of values into an F-Curve at once, replacing the keys already on those frames
+def write_fcurve(fcurve, frames, values):
+    
+    points = fcurve.keyframe_points
+    count = len(points)
+    co = np.empty(count * 2)
+    points.foreach_get('co', co)
+    co = co.reshape(-1, 2)
+    
+    existing = {round(frame, 3): index for index, frame in enumerate(co[:, 0])}
+    shift = np.zeros(count)
+    added = []
+    for frame, value in zip(frames, values):
+        index = existing.get(round(frame, 3))
+        if index is None:
+            added.append((frame, value))
+        else:
+            shift[index] = value - co[index, 1]
+            co[index, 1] = value
+    
+    # Move the handles of replaced keys along with them so their shape is kept
+    handles = {}
+    for attribute in ('handle_left', 'handle_right'):
+        handle = np.empty(count * 2)
+        points.foreach_get(attribute, handle)
+        handle = handle.reshape(-1, 2)
+        handle[:, 1] += shift
+        handles[attribute] = handle
+    
+    if added:
+        added = np.array(added, dtype=np.float64)
+        points.add(len(added))
+        co = np.concatenate([co, added])
+        for attribute in handles:
+            handles[attribute] = np.concatenate([handles[attribute], added])
+    
+    points.foreach_set('co', co.ravel())
+    for attribute, handle in handles.items():
+        points.foreach_set(attribute, handle.ravel())
+    fcurve.update()
+
+# Return the data path prefix and action group used for keying an object or pose bone
+def key_channels(owner):
+    if isinstance(owner, bpy.types.PoseBone):
+        return f'pose.bones["{owner.name}"].', owner.name
+    return '', 'Object Transforms'
+
+# Add solved location and rotation tracks, and scale when given, to a scratch buffer instead of keying them
+# on the spot. The buffer maps each animated ID to its channels, {(data path, index): (group, frame chunks,
+# value chunks)}, and is written to the actions in one go by commit_keys
+def buffer_keys(scratch, owner, frames, loc, rotation, scale=None):
+    
+    prefix, group = key_channels(owner)
+    channels = scratch.setdefault(owner.id_data, {})
+    frames = np.asarray(frames, dtype=np.float64)
+    
+    tracks = [('location', loc), (rotation_path(owner), rotation)]
+    if scale is not None:
+        tracks.append(('scale', scale))
+    for path, values in tracks:
+        for index in range(values.shape[1]):
+            channel = channels.setdefault((prefix + path, index), (group, [], []))
+            channel[1].append(frames)
+            channel[2].append(np.array(values[:, index], dtype=np.float64))
+
+# Add the owner's current location and rotation at the frame to a scratch buffer
+def buffer_pose(scratch, owner, frame):
+    rotation = np.array([getattr(owner, rotation_path(owner))], dtype=np.float64)
+    buffer_keys(scratch, owner, [frame], np.array([owner.location], dtype=np.float64), rotation)
+
+# Build a new action holding only the buffered channels and swap it into the ID's animation data,
+# which is a single assignment instead of keys landing one by one on a live action
+def swap_action(id_data, channels):
+    
+    action = bpy.data.actions.new(name=f'{id_data.name}Action')
+    slot = None
+    
+    # Blender 4.4+ layered actions need a slot, layer, strip and channelbag to hold the curves
+    if hasattr(action, 'slots') and hasattr(action, 'layers'):
+        slot = action.slots.new(id_type=id_data.id_type, name=id_data.name)
+        strip = action.layers.new(name='Layer').strips.new(type='KEYFRAME')
+        channelbag = strip.channelbag(slot, ensure=True)
+        for (path, index), (group, frames, values) in channels.items():
+            fcurve = channelbag.fcurves.new(path, index=index)
+            fcurve.group = channelbag.groups.get(group) or channelbag.groups.new(group)
+            write_fcurve(fcurve, frames, values)
+    else:
+        for (path, index), (group, frames, values) in channels.items():
+            fcurve = action.fcurves.new(path, index=index, action_group=group)
+            write_fcurve(fcurve, frames, values)
+    
+    anim = id_data.animation_data or id_data.animation_data_create()
+    anim.action = action
+    if slot is not None:
+        anim.action_slot = slot
+
+# Write everything in the scratch buffer to the actions, one bulk write per channel.
+# IDs that have no action yet get a scratch action swapped in, the others are merged into their action
+def commit_keys(scratch):
+    
+    for id_data, channels in scratch.items():
+        merged = {}
+        for key, (group, frame_chunks, value_chunks) in channels.items():
+            # Later chunks win when the same frame was buffered twice
+            frames = np.concatenate(frame_chunks)[::-1]
+            values = np.concatenate(value_chunks)[::-1]
+            frames, first = np.unique(frames, return_index=True)
+            merged[key] = (group, frames, values[first])
+        
+        anim = id_data.animation_data
+        if anim is None or anim.action is None:
+            swap_action(id_data, merged)
+        else:
+            for (path, index), (group, frames, values) in merged.items():
+                write_fcurve(ensure_fcurve(id_data, path, index, group), frames, values)
+        id_data.update_tag()
+        
+    scratch.clear()
+
+# Bake the copied relationship over the given frames. The main thread only steps the scene and pulls
+# raw matrices into arrays, full chunks of frames are handed to a thread pool for the NumPy solve and
+# rotation conversion while the next chunk is being evaluated, and the keys are written once at the end
+def bake_relative(context, parent, child, armature, bone, frames):
+    
+    scene = context.scene
+    frame_reference = scene.frame_current
+    count = len(frames)
+    relative = np.array(NB_relative, dtype=np.float64)
+    
+    world = np.empty((count, 4, 4))
+    pre = np.empty((count, 4, 4))
+    scale = np.empty((count, 3))
+    post = np.empty((count, 4, 4))
+    
+    futures = []
+    with ThreadPoolExecutor(max_workers=NB_bake_workers) as pool:
+        start = 0
+        for index, frame in enumerate(frames):
+            scene.frame_set(frame)
+            world[index] = world_matrix(parent)
+            pre[index], scale[index], post[index] = snap_spaces(child, armature, bone)
+            if index == 0:
+                reference = np.array(getattr(child, rotation_path(child)))
+            end = index + 1
+            if end - start == NB_bake_chunk or end == count:
+                futures.append(pool.submit(solve_chunk, world[start:end], relative,
+                                           pre[start:end], scale[start:end], post[start:end]))
+                start = end
+        results = [future.result() for future in futures]
+    
+    loc = np.concatenate([result[0] for result in results])
+    rotation = rotation_values(np.concatenate([result[1] for result in results]), child.rotation_mode, reference)
+    scratch = {}
+    buffer_keys(scratch, child, frames, loc, rotation)
+    commit_keys(scratch)
+    scene.frame_set(frame_reference)
+
+# Return the Child Of targets of the owner, as bones where the constraint points at one
+def childof_targets(owner):
+    targets = []
+    for con in owner.constraints:
+        if valid_constraint(con):
+            target = con.target
+            if con.subtarget and target.pose and con.subtarget in target.pose.bones:
+                target = target.pose.bones[con.subtarget]
+            targets.append(target)
+    return targets
+
+# Return every object and bone a relative bake of the child depends on, apart from the child itself:
+# whatever the child is parented to, the parent and the child's Child Of targets with everything they
+# inherit from, and the same again for the Child Of targets of everything found on the way.
+# Each owner is only visited once, so constraint cycles can't loop forever
+def bake_chain(parent, child):
+    
+    chain = []
+    keys = {owner_key(child)}
+    pending = owner_chain(child)[1:] + [parent] + childof_targets(child)
+    
+    while pending:
+        for item in owner_chain(pending.pop(0)):
+            if owner_key(item) not in keys:
+                keys.add(owner_key(item))
+                chain.append(item)
+                pending.extend(childof_targets(item))
+    
+    return chain
+
+# Return the channels and static settings a relative bake of the child depends on: those of bake_chain,
+# plus the child's own constraint settings and influence curves (but not its transform curves,
+# those are what the bake writes)
+def bake_sources(parent, child):
+    
+    chain = bake_chain(parent, child)
+    fcurves, animated, actions = chain_fcurves(chain)
+    child_fcurves, child_animated, child_actions = chain_fcurves([child])
+    fcurves.extend(fcurve for fcurve in child_fcurves if 'constraints["' in fcurve.data_path)
+    static = tuple(actions) + static_signature(chain, animated) + static_signature([child], child_animated)
+    
+    return fcurves, static
+
+# Sample the fingerprint of a bake: every source channel evaluated at every frame, straight from the
+# F-Curves so it needs no scene evaluation. Returns the channel names and an (n, channels) float32 array
+def bake_fingerprint(parent, child, frames):
+    fcurves, static = bake_sources(parent, child)
+    channels = tuple((fcurve.id_data.name_full, fcurve.data_path, fcurve.array_index) for fcurve in fcurves)
+    samples = np.empty((len(frames), len(fcurves)), dtype=np.float32)
+    for column, fcurve in enumerate(fcurves):
+        samples[:, column] = [fcurve.evaluate(frame) for frame in frames]
+    return channels, static, samples
+
+# Sample the child's keyed location and rotation at the frames, NaN where a frame holds no key,
+# so keys of the last bake that were undone or edited by hand can be told apart from what it wrote
+def baked_values(child, frames):
+    
+    prefix, group = key_channels(child)
+    anim = child.id_data.animation_data
+    curves = {(fcurve.data_path, fcurve.array_index): fcurve
+              for fcurve in get_action_fcurves(anim.action if anim else None)}
+    path = rotation_path(child)
+    channels = tuple([(prefix + 'location', index) for index in range(3)]
+                     + [(prefix + path, index) for index in range(len(getattr(child, path)))])
+    
+    values = np.full((len(frames), len(channels)), np.nan, dtype=np.float32)
+    wanted = np.round(np.asarray(frames, dtype=np.float64), 3)
+    for column, channel in enumerate(channels):
+        fcurve = curves.get(channel)
+        if fcurve is None:
+            continue
+        co = np.empty(len(fcurve.keyframe_points) * 2)
+        fcurve.keyframe_points.foreach_get('co', co)
+        for row in np.flatnonzero(np.isin(wanted, np.round(co[0::2], 3))):
+            values[row, column] = fcurve.evaluate(frames[row])
+    
+    return channels, values
+
+# Whether any source of the bake moves in ways sampling F-Curves can't see:
+# constraints other than Child Of, drivers or NLA tracks
+def live_sources(parent, child):
+    for item in bake_chain(parent, child) + [child]:
+        if any(con.type != 'CHILD_OF' and con.enabled for con in item.constraints):
+            return True
+        anim = item.id_data.animation_data
+        if anim and (len(anim.drivers) or len(anim.nla_tracks)):
+            return True
+    return False
+
+# Return the frames a re-bake over the given frames has to solve again: those whose sources moved past
+# the tolerance since the last bake or whose baked keys no longer match, widened by a frame on each side
+# so the keys around them follow. Everything is dirty if there's no earlier bake, a source is live,
+# or the relationship, channels or static settings changed
+def rebake_frames(parent, child, frames):
+    
+    record = NB_bake_fingerprints.get((owner_key(parent), owner_key(child)))
+    if record is None or live_sources(parent, child):
+        return list(frames)
+    old_frames, relative, old_channels, old_static, old_samples, old_keyed, old_baked = record
+    channels, static, samples = bake_fingerprint(parent, child, frames)
+    keyed, baked = baked_values(child, frames)
+    if (channels != old_channels or static != old_static or keyed != old_keyed
+            or not np.allclose(relative, np.array(NB_relative), atol=NB_rebake_tolerance)):
+        return list(frames)
+    
+    rows = {frame: row for row, frame in enumerate(old_frames)}
+    dirty = np.ones(len(frames), dtype=bool)
+    for index, frame in enumerate(frames):
+        row = rows.get(frame)
+        if row is not None:
+            # A missing key is NaN, which never compares as close
+            dirty[index] = (np.any(np.abs(samples[index] - old_samples[row]) > NB_rebake_tolerance)
+                            or not np.all(np.abs(baked[index] - old_baked[row]) <= NB_rebake_tolerance))
+    
+    spans = dirty.copy()
+    spans[1:] |= dirty[:-1]
+    spans[:-1] |= dirty[1:]
+    return [frame for frame, span in zip(frames, spans) if span]
+
+# Remember the fingerprint of a finished bake and the keys it left on the child for the next re-bake
+def store_bake_fingerprint(parent, child, frames):
+    channels, static, samples = bake_fingerprint(parent, child, frames)
+    keyed, baked = baked_values(child, frames)
+    NB_bake_fingerprints[(owner_key(parent), owner_key(child))] = (list(frames), np.array(NB_relative, dtype=np.float32),
+                                                                   channels, static, samples, keyed, baked)
+
+# NumPy version of one constraint's part of calculate_childof, for a whole track of target world matrices
+def childof_track(con, target_world):
+    
+    scale = np.array([con.use_scale_x, con.use_scale_y, con.use_scale_z])
+    
+    t, r, sc = decompose_track(target_world)
+    pm = compose_track(t, rotation_from_quaternions(quaternion_track(r)), np.where(scale, sc, 1.0))
+    t1, r1, sc1 = decompose_track(np.array(con.inverse_matrix)[np.newaxis])
+    im = compose_track(t1, rotation_from_quaternions(quaternion_track(r1)), np.where(scale, sc1, 1.0))
+    
+    return np.linalg.inv(im) @ np.linalg.inv(pm)
+
+# Return (source, target) bone name pairs from a text of "source = target" lines, or every bone name
+# the two armatures share if there's no text. Empty lines and lines starting with # are skipped
+def bone_mapping(text, source, target):
+    
+    pairs = []
+    if text is None:
+        for pose_bone in target.pose.bones:
+            if pose_bone.name in source.pose.bones:
+                pairs.append((pose_bone.name, pose_bone.name))
+        return pairs
+    
+    for line in text.as_string().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        source_name, target_name = (name.strip() for name in line.split('=', 1))
+        if source_name in source.pose.bones and target_name in target.pose.bones:
+            pairs.append((source_name, target_name))
+    return pairs
+
+# Order the mapped target bones so every bone comes after its mapped parents and after the mapped
+# bones its Child Of constraints point to, which is the order their new poses become known in
+def solve_order(target, names):
+    
+    order = []
+    visited = set()
+    
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        pose_bone = target.pose.bones[name]
+        for parent in pose_bone.parent_recursive:
+            if parent.name in names:
+                visit(parent.name)
+        for con in pose_bone.constraints:
+            if valid_constraint(con) and con.target == target and con.subtarget in names:
+                visit(con.subtarget)
+        order.append(name)
+        
+    for name in names:
+        visit(name)
+    return order
+
+# Transfer the world space motion of the mapped source bones onto the target rig over the frames.
+# The scene is stepped through once to sample both rigs, then the target bones are solved parent first
+# with their Child Of compensation, using the poses solved so far for their parents and targets
+def transfer_pose(context, source, target, pairs, frames, keep_offset):
+    
+    scene = context.scene
+    frame_reference = scene.frame_current
+    count = len(frames)
+    mapping = {target_name: source_name for source_name, target_name in pairs}
+    order = solve_order(target, set(mapping))
+    identity = np.identity(4)
+    
+    # Bones of the target rig whose pose we need: the mapped ones, their parents and Child Of targets
+    needed = set()
+    for name in order:
+        pose_bone = target.pose.bones[name]
+        needed.add(name)
+        needed.update(parent.name for parent in pose_bone.parent_recursive)
+        for con in pose_bone.constraints:
+            if valid_constraint(con) and con.target == target and con.subtarget in target.pose.bones:
+                needed.add(con.subtarget)
+                needed.update(parent.name for parent in target.pose.bones[con.subtarget].parent_recursive)
+    
+    # Offsets between the rigs are taken at the current frame, like COPY_RELATIVE does
+    offsets = {}
+    for name in order:
+        if keep_offset:
+            source_matrix = world_matrix(source.pose.bones[mapping[name]])
+            offsets[name] = np.array(source_matrix.inverted() @ world_matrix(target.pose.bones[name]))
+        else:
+            offsets[name] = identity
+    
+    source_names = set(mapping.values())
+    source_world = {name: np.empty((count, 4, 4)) for name in source_names}
+    old_pose = {name: np.empty((count, 4, 4)) for name in needed}
+    scale = {name: np.empty((count, 3)) for name in order}
+    references = {}
+    armature_world = np.empty((count, 4, 4))
+    constraints = {}
+    for name in order:
+        constraints[name] = [(con, np.empty(count), np.empty((count, 4, 4)))
+                             for con in target.pose.bones[name].constraints if valid_constraint(con)]
+    
+    for index, frame in enumerate(frames):
+        scene.frame_set(frame)
+        armature_world[index] = target.matrix_world
+        for name in source_names:
+            source_world[name][index] = world_matrix(source.pose.bones[name])
+        for name in needed:
+            old_pose[name][index] = target.pose.bones[name].matrix
+        for name in order:
+            scale[name][index] = target.pose.bones[name].scale
+            if index == 0:
+                references[name] = np.array(getattr(target.pose.bones[name], rotation_path(target.pose.bones[name])))
+            for con, influence, target_world in constraints[name]:
+                influence[index] = con.influence
+                if con.target != target:
+                    owner = con.target.pose.bones.get(con.subtarget) if con.subtarget and con.target.pose else con.target
+                    target_world[index] = world_matrix(owner)
+    scene.frame_set(frame_reference)
+    
+    solved = {}
+    scratch = {}
+    
+    # A bone we don't key follows the nearest solved bone above it
+    def new_pose(name):
+        if name in solved:
+            return solved[name]
+        for parent in target.pose.bones[name].parent_recursive:
+            if parent.name in solved:
+                return solved[parent.name] @ np.linalg.inv(old_pose[parent.name]) @ old_pose[name]
+        return old_pose[name]
+    
+    for name in order:
+        pose_bone = target.pose.bones[name]
+        
+        # Child Of compensation on the frames where any constraint is active, the armature otherwise
+        pre = np.tile(identity, (count, 1, 1))
+        active = np.zeros(count, dtype=bool)
+        for con, influence, target_world in constraints[name]:
+            if con.target == target and con.subtarget in target.pose.bones:
+                target_world = armature_world @ new_pose(con.subtarget)
+            elif con.target == target:
+                target_world = armature_world
+            on = influence != 0.0
+            pre[on] = pre[on] @ childof_track(con, target_world[on])
+            active |= on
+        pre[~active] = np.linalg.inv(armature_world[~active])
+        
+        rest = np.array(pose_bone.bone.matrix_local)
+        if pose_bone.parent is None:
+            post = np.tile(np.linalg.inv(rest), (count, 1, 1))
+        else:
+            parent_rest = np.array(pose_bone.parent.bone.matrix_local)
+            post = np.linalg.inv(new_pose(pose_bone.parent.name) @ (np.linalg.inv(parent_rest) @ rest))
+        
+        loc, rot = solve_chunk(source_world[mapping[name]], offsets[name], pre, scale[name], post)
+        rotation = rotation_values(rot, pose_bone.rotation_mode, references[name])
+        
+        # Remember where the bone ends up for the bones solved after it
+        target_pose = pre @ (source_world[mapping[name]] @ offsets[name])
+        t, r, s = decompose_track(target_pose)
+        target_pose = compose_track(t, r, scale[name])
+        pose = np.linalg.inv(armature_world) @ source_world[mapping[name]] @ offsets[name]
+        pose[~active] = target_pose[~active]
+        solved[name] = pose
+        
+        buffer_keys(scratch, pose_bone, frames, loc, rotation)
+    
+    commit_keys(scratch)
+    scene.frame_set(frame_reference)
+    return order
+
+# Return the owner's valid Child Of constraints, each with its influence F-Curve or None if it isn't animated
+def influence_curves(owner):
+    
+    prefix = key_channels(owner)[0]
+    anim = owner.id_data.animation_data
+    fcurves = get_action_fcurves(anim.action) if anim else []
+    
+    curves = []
+    for con in owner.constraints:
+        if valid_constraint(con):
+            fcurve_name = f'{prefix}constraints["{con.name}"].influence'
+            curve = None
+            for fcurve in fcurves:
+                if fcurve.data_path == fcurve_name and not fcurve.mute:
+                    curve = fcurve
+                    break
+            curves.append((con, curve))
+    return curves
+
+# Return every frame where the set of active Child Of constraints on the owner changes, read straight
+# from the influence F-Curves. A switch at a frame means it and the frame before use different constraints
+def switch_frames(owner):
+    
+    curves = influence_curves(owner)
+    candidates = set()
+    for con, fcurve in curves:
+        if fcurve is not None:
+            candidates.update(round(point.co[0]) for point in fcurve.keyframe_points)
+    
+    def active(frame):
+        return tuple(abs(fcurve.evaluate(frame) if fcurve is not None else con.influence) > 0.000001
+                     for con, fcurve in curves)
+    
+    return [frame for frame in sorted(candidates) if active(frame - 1) != active(frame)]
+
+# Return the frames the owner has location or rotation keys on
+def transform_key_frames(owner):
+    prefix = key_channels(owner)[0]
+    paths = {prefix + 'location', prefix + rotation_path(owner)}
+    anim = owner.id_data.animation_data
+    frames = set()
+    for fcurve in get_action_fcurves(anim.action) if anim else []:
+        if fcurve.data_path in paths:
+            frames.update(point.co[0] for point in fcurve.keyframe_points)
+    return sorted(frames)
+
+# Keep the owner's world transform across every constraint switch: evaluate it on the frame before each
+# switch, key the owner's current local values there so the new key can't bend the curve into it, then
+# solve it for the constraints active on the switch frame and key it there. Switches are solved and keyed
+# in batches. A new key also moves the auto-clamped handles of its neighbouring keys, so it can change the
+# pose up to the second existing key after it, and a batch is written early unless two keys of the owner
+# lie between it and the frame the next switch reads. Returns the switches skipped as unsafe to evaluate
+def compensate_switches(context, owner, armature, bone, frames):
+    
+    scene = context.scene
+    frame_reference = scene.frame_current
+    direct = bone and not full_inherit(owner)
+    key_frames = transform_key_frames(owner)
+    rotation_mode = owner.rotation_mode
+    identity = np.identity(4)
+    
+    scratch = {}
+    pending = []
+    batch = []
+    skipped = []
+    
+    def flush():
+        if batch:
+            world, pre, scale, post, reference = (np.array(values) for values in zip(*(entry[1:] for entry in batch)))
+            loc, rot = solve_chunk(world, identity, pre, scale, post)
+            rotation = rotation_values(rot, rotation_mode, reference)
+            buffer_keys(scratch, owner, [entry[0] for entry in batch], loc, rotation)
+            batch.clear()
+        commit_keys(scratch)
+        key_frames.extend(pending)
+        pending.clear()
+    
+    for frame in frames:
+        before = frame - 1
+        if any(sum(pending_frame < key <= before for key in key_frames) < 2 for pending_frame in pending):
+            flush()
+        
+        scene.frame_set(before)
+        world = world_matrix(owner)
+        held = (np.array([owner.location], dtype=np.float64),
+                np.array([getattr(owner, rotation_path(owner))], dtype=np.float64))
+        scene.frame_set(frame)
+        
+        safe, influences = get_channels(owner)
+        if not all(safe):
+            skipped.append(frame)
+            continue
+        
+        buffer_keys(scratch, owner, [before], *held)
+        if direct:
+            apply_snap(calculate_childof(owner), world, owner, armature, bone)
+            buffer_pose(scratch, owner, frame)
+        else:
+            pre, scale, post = snap_spaces(owner, armature, bone)
+            reference = np.array(getattr(owner, rotation_path(owner)))
+            batch.append((frame, np.array(world), np.array(pre), np.array(scale), np.array(post), reference))
+        pending.extend((before, frame))
+    
+    flush()
+    scene.frame_set(frame_reference)
+    return skipped
+
+# Remove an F-Curve from its action, whether it sits in a layered action's channelbag or the legacy list
+def remove_fcurve(action, fcurve):
+    for layer in getattr(action, "layers", []):
+        for strip in getattr(layer, "strips", []):
+            for channelbag in getattr(strip, "channelbags", []):
+                for fcu in channelbag.fcurves:
+                    if fcu == fcurve:
+                        channelbag.fcurves.remove(fcurve)
+                        return
+    action.fcurves.remove(fcurve)
+
+# Bake the final world motion of the owners into plain keys over the frames, then remove or mute their
+# Child Of constraints and influence curves. Every frame is evaluated once for all owners, each owner is
+# solved for its whole range without constraints (the apply_snap no-constraint path) and keyed in bulk.
+# Scale is only keyed on owners whose constraints scaled them, as it would change once they're gone
+def bake_down(context, owners, frames, remove):
+    
+    scene = context.scene
+    frame_reference = scene.frame_current
+    count = len(frames)
+    identity = np.identity(4)
+    
+    tracks = []
+    for owner in owners:
+        bone = isinstance(owner, bpy.types.PoseBone)
+        tracks.append((owner, owner.id_data if bone else '', bone, np.empty((count, 4, 4)), np.empty((count, 4, 4)),
+                       np.empty((count, 3)), np.empty((count, 4, 4)), np.empty((count, 3))))
+    references = {}
+    
+    for index, frame in enumerate(frames):
+        scene.frame_set(frame)
+        for owner, armature, bone, world, pre, scale, post, own_scale in tracks:
+            world[index] = world_matrix(owner)
+            pre[index], scale[index], post[index] = snap_spaces(owner, armature, bone, use_constraints=False)
+            own_scale[index] = owner.scale
+            if index == 0:
+                references[owner_key(owner)] = np.array(getattr(owner, rotation_path(owner)))
+    
+    scratch = {}
+    for owner, armature, bone, world, pre, scale, post, own_scale in tracks:
+        loc, rot = solve_chunk(world, identity, pre, scale, post)
+        rotation = rotation_values(rot, owner.rotation_mode, references[owner_key(owner)])
+        size = decompose_track(post @ (pre @ world))[2]
+        if np.allclose(size, own_scale, atol=0.00001):
+            size = None
+        buffer_keys(scratch, owner, frames, loc, rotation, size)
+    commit_keys(scratch)
+    
+    for owner, armature, bone, world, pre, scale, post, own_scale in tracks:
+        anim = owner.id_data.animation_data
+        prefix = key_channels(owner)[0]
+        for con, fcurve in influence_curves(owner):
+            # Muted influence curves too, influence_curves only returns the one in use
+            path = f'{prefix}constraints["{con.name}"].influence'
+            curves = [fcurve for fcurve in get_action_fcurves(anim.action if anim else None) if fcurve.data_path == path]
+            if remove:
+                for fcurve in curves:
+                    remove_fcurve(anim.action, fcurve)
+                owner.constraints.remove(con)
+            else:
+                for fcurve in curves:
+                    fcurve.mute = True
+                con.enabled = False
+        owner.id_data.update_tag()
+    
+    scene.frame_set(frame_reference)
+
+
+
+##### Sticky mode #####
+
+# Return the pinned object or pose bone for a key from NB_sticky, or None if it's gone
+def sticky_owner(key):
+    obj = bpy.data.objects.get(key[0])
+    if obj is None or not key[1]:
+        return obj
+    return obj.pose.bones.get(key[1]) if obj.pose else None
+
+# Return what a pinned item hangs off right now: the world matrix of whatever it's parented to and
+# the influences and world matrices of its Child Of targets. When this changes, the item needs snapping back
+def sticky_sources(owner):
+    
+    sources = []
+    
+    if isinstance(owner, bpy.types.PoseBone):
+        parent = owner.parent if owner.parent is not None else owner.id_data
+        sources.append(world_matrix(parent))
+    elif owner.parent is not None:
+        # Covers objects parented to a bone, which hang off that bone rather than the armature
+        sources.append(parent_matrix(owner))
+    
+    for con in owner.constraints:
+        if valid_constraint(con):
+            target = con.target
+            if con.subtarget and target.pose and con.subtarget in target.pose.bones:
+                target = target.pose.bones[con.subtarget]
+            sources.append(con.influence)
+            sources.append(world_matrix(target))
+    
+    return tuple(round(value, 5) for source in sources
+                 for value in ((source,) if isinstance(source, float) else (v for row in source for v in row)))
+
+# Pin an object or pose bone at its current world matrix
+def sticky_pin(owner):
+    NB_sticky[owner_key(owner)] = (world_matrix(owner), sticky_sources(owner))
+
+# Check the pinned items for moved parents and snap them back to their pinned world matrix, optionally
+# keying them. Stops once the time budget is spent and leaves the rest for a timer, so a big pin set
+# can't stall playback; the queue is rotated so every item gets its turn
+def sticky_update():
+    
+    global NB_sticky_busy
+    
+    if NB_sticky_busy:
+        return None
+    NB_sticky_busy = True
+    
+    try:
+        context = bpy.context
+        screen = context.screen
+        key = context.scene.my_tool.sticky_key and not (screen and screen.is_animation_playing)
+        start = time.perf_counter()
+        
+        if not NB_sticky_queue:
+            NB_sticky_queue.extend(NB_sticky)
+        moved = False
+        
+        while NB_sticky_queue:
+            if time.perf_counter() - start > NB_sticky_budget:
+                sticky_schedule()
+                break
+            owner_id = NB_sticky_queue.popleft()
+            pin = NB_sticky.get(owner_id)
+            owner = sticky_owner(owner_id)
+            if pin is None or owner is None:
+                NB_sticky.pop(owner_id, None)
+                continue
+            
+            matrix, sources = pin
+            current = sticky_sources(owner)
+            if current == sources:
+                # The item was moved by hand or by its own keys, so pin it where it is now
+                NB_sticky[owner_id] = (world_matrix(owner), sources)
+                continue
+            
+            bone = isinstance(owner, bpy.types.PoseBone)
+            armature = owner.id_data if bone else ''
+            matrices = calculate_childof(owner)
+            apply_snap(matrices, matrix, owner, armature, bone)
+            if key:
+                key_object(owner)
+            NB_sticky[owner_id] = (matrix, current)
+            moved = True
+        
+        # Evaluate the snapped items while still guarded, so the depsgraph update this fires is ignored
+        # and the next check sees where they really ended up
+        if moved:
+            context.view_layer.update()
+    finally:
+        NB_sticky_busy = False
+        
+    return None
+
+# Run sticky_update from a timer, registering it only once however many updates ask for it
+def sticky_schedule():
+    if not bpy.app.timers.is_registered(sticky_update):
+        bpy.app.timers.register(sticky_update, first_interval=0.0)
+
+# Depsgraph updates come in bursts while editing, so they only schedule one update for later
+@persistent
+def sticky_depsgraph_handler(scene, depsgraph=None):
+    if NB_sticky and not NB_sticky_busy:
+        sticky_schedule()
+
+# Frame changes are handled right away so the pinned items keep up with playback
+@persistent
+def sticky_frame_handler(scene, depsgraph=None):
+    if NB_sticky and not NB_sticky_busy:
+        if bpy.app.timers.is_registered(sticky_update):
+            bpy.app.timers.unregister(sticky_update)
+        # Carry on with what's left of an unfinished update, then check the other items again for this frame
+        queued = set(NB_sticky_queue)
+        NB_sticky_queue.extend(key for key in NB_sticky if key not in queued)
+        sticky_update()
+
+# Add or remove the sticky handlers depending on whether anything is pinned
+def sticky_handlers(enable):
+    handlers = ((bpy.app.handlers.depsgraph_update_post, sticky_depsgraph_handler),
+                (bpy.app.handlers.frame_change_post, sticky_frame_handler))
+    for handler_list, handler in handlers:
+        if enable and handler not in handler_list:
+            handler_list.append(handler)
+        elif not enable and handler in handler_list:
+            handler_list.remove(handler)
+    if not enable and bpy.app.timers.is_registered(sticky_update):
+        bpy.app.timers.unregister(sticky_update)
+
+# Unpin everything and stop listening for updates
+def sticky_clear():
+    NB_sticky.clear()
+    NB_sticky_queue.clear()
+    sticky_handlers(False)
+
+##### Safety audit #####
+
+# Return the unsafe Child Of constraints of every object and pose bone of an object as
+# {bone name or '': [(constraint name, reason)]}. Animated influences are judged by their keys
+# rather than their value on the current frame, since a bake goes through all of them
+def audit_object(obj):
+    
+    anim = obj.animation_data
+    fcurves = {fcurve.data_path: fcurve for fcurve in get_action_fcurves(anim.action if anim else None)}
+    
+    owners = [obj]
+    if obj.pose:
+        owners.extend(obj.pose.bones)
+    
+    entries = {}
+    for owner in owners:
+        prefix = key_channels(owner)[0] if owner != obj else ''
+        issues = []
+        for con in owner.constraints:
+            if valid_constraint(con):
+                fcurve = fcurves.get(f'{prefix}constraints["{con.name}"].influence')
+                animated = fcurve is not None and not fcurve.mute
+                issue = constraint_issue(con, check_influence=not animated)
+                if not issue and animated:
+                    if any(point.co[1] != 0 and point.co[1] != 1 for point in fcurve.keyframe_points):
+                        issue = 'Influence keyed between 0 and 1'
+                if issue:
+                    issues.append((con.name, issue))
+        if issues:
+            entries['' if owner == obj else owner.name] = issues
+    return entries
+
+# Bring the audit index up to date: scan the whole file the first time, afterwards only the objects
+# the depsgraph reported as changed, and drop the ones that no longer exist
+def audit_refresh():
+    
+    global NB_audit_ready
+    
+    if not NB_audit_ready:
+        NB_audit.clear()
+        NB_audit_dirty.clear()
+        for obj in bpy.data.objects:
+            entries = audit_object(obj)
+            if entries:
+                NB_audit[object_key(obj)] = entries
+        NB_audit_ready = True
+        return
+    
+    for key in NB_audit_dirty:
+        obj = bpy.data.objects.get(key)
+        entries = audit_object(obj) if obj is not None else None
+        if entries:
+            NB_audit[key] = entries
+        else:
+            NB_audit.pop(key, None)
+    NB_audit_dirty.clear()
+    
+    for key in [key for key in NB_audit if bpy.data.objects.get(key) is None]:
+        del NB_audit[key]
+
+# Return the unsafe constraints of an object or pose bone from the audit index as [(constraint name, reason)]
+def audit_issues(owner):
+    audit_refresh()
+    key = owner_key(owner)
+    return NB_audit.get(key[0], {}).get(key[1], [])
+
+# Return the number of unsafe constraints in the file
+def audit_count():
+    audit_refresh()
+    return sum(len(issues) for entries in NB_audit.values() for issues in entries.values())
+
+# Forget the audit index so the next query scans the whole file again
+def audit_reset():
+    global NB_audit_ready
+    NB_audit.clear()
+    NB_audit_dirty.clear()
+    NB_audit_ready = False
+
+# Mark the objects touched by a depsgraph update for rescanning, the scan itself waits for the next query
+@persistent
+def audit_depsgraph_handler(scene, depsgraph=None):
+    if not NB_audit_ready or depsgraph is None:
+        return
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        if isinstance(id_data, bpy.types.Object):
+            NB_audit_dirty.add(object_key(id_data))
+        elif isinstance(id_data, bpy.types.Action):
+            for obj in bpy.data.objects:
+                if obj.animation_data and obj.animation_data.action == id_data:
+                    NB_audit_dirty.add(object_key(obj))
+
+##### Transform library #####
+
+# On disk the library is a 16 byte header (magic, version, entry count, reserved), followed by a
+# fixed-size name index of every entry and then the 4x4 float32 matrices in the same order.
+# Both blocks are memory-mapped, so browsing names never reads the matrices
+NB_LIBRARY_MAGIC = b'NBXF'
+NB_LIBRARY_VERSION = 1
+NB_LIBRARY_HEADER = struct.Struct('<4sIII')
+NB_LIBRARY_INDEX = np.dtype([('kind', 'u1'), ('name', 'S63')])
+NB_LIBRARY_MATRIX = np.dtype(('<f4', (4, 4)))
+NB_LIBRARY_KINDS = ('POSE', 'RELATIVE')
+
+# Return the library file path set in the panel, or the default one in Blender's config folder
+def library_path(context):
+    path = context.scene.my_tool.library_path
+    if path:
+        return bpy.path.abspath(path)
+    return os.path.join(bpy.utils.user_resource('CONFIG', path='absolute_snap', create=True), 'library.nbxf')
+
+# Memory-map the library, reusing the open maps until the file changes on disk (another artist saved to it)
+# Returns (index, matrices), both empty if there's no library yet
+def load_library(path):
+    
+    global NB_library
+    
+    try:
+        stat = os.stat(path)
+    except OSError:
+        NB_library = None
+        return np.empty(0, NB_LIBRARY_INDEX), np.empty(0, NB_LIBRARY_MATRIX)
+    
+    if NB_library is not None and NB_library[0] == (path, stat.st_mtime_ns, stat.st_size):
+        return NB_library[1], NB_library[2]
+    
+    NB_library = None
+    with open(path, 'rb') as file:
+        magic, version, count, reserved = NB_LIBRARY_HEADER.unpack(file.read(NB_LIBRARY_HEADER.size))
+    if magic != NB_LIBRARY_MAGIC or version != NB_LIBRARY_VERSION:
+        raise ValueError(f'{path} is not an Absolute Snap library')
+    if not count:
+        return np.empty(0, NB_LIBRARY_INDEX), np.empty(0, NB_LIBRARY_MATRIX)
+    
+    offset = NB_LIBRARY_HEADER.size
+    index = np.memmap(path, dtype=NB_LIBRARY_INDEX, mode='r', offset=offset, shape=(count,))
+    offset += count * NB_LIBRARY_INDEX.itemsize
+    matrices = np.memmap(path, dtype=NB_LIBRARY_MATRIX, mode='r', offset=offset, shape=(count,))
+    NB_library = ((path, stat.st_mtime_ns, stat.st_size), index, matrices)
+    return index, matrices
+
+# Write the whole library to a temporary file of its own next to the old one and swap it in, so readers
+# never see a half written file and two artists saving at once can't write into each other's file.
+# Saves read the library again right before writing it, but two saves that overlap still don't merge:
+# the last writer wins and an entry stored or removed by the other one is lost
+def save_library(path, index, matrices):
+    
+    global NB_library
+    NB_library = None
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory or None)
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(NB_LIBRARY_HEADER.pack(NB_LIBRARY_MAGIC, NB_LIBRARY_VERSION, len(index), 0))
+            file.write(np.ascontiguousarray(index, dtype=NB_LIBRARY_INDEX).tobytes())
+            file.write(np.ascontiguousarray(matrices, dtype=NB_LIBRARY_MATRIX.base).reshape(-1, 4, 4).tobytes())
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Encode a name to fit the index, cutting it on a character boundary
+def library_name(name):
+    return name.encode('utf-8')[:NB_LIBRARY_INDEX['name'].itemsize].decode('utf-8', 'ignore').encode('utf-8')
+
+# Return the mask of library entries with the given kind and name
+def library_match(index, kind, name):
+    if kind not in NB_LIBRARY_KINDS:
+        return np.zeros(len(index), dtype=bool)
+    return (index['name'] == library_name(name)) & (index['kind'] == NB_LIBRARY_KINDS.index(kind))
+
+# Split a library search item identifier back into its kind and name
+def library_item_key(identifier):
+    kind, x, name = identifier.partition(':')
+    return kind, name
+
+# Add an entry to the library, replacing an existing one with the same name and kind
+def library_store(path, name, kind, matrix):
+    
+    index, matrices = load_library(path)
+    index = np.array(index)
+    matrices = np.array(matrices)
+    
+    keep = ~library_match(index, kind, name)
+    
+    entry = np.array([(NB_LIBRARY_KINDS.index(kind), library_name(name))], dtype=NB_LIBRARY_INDEX)
+    save_library(path, np.concatenate([index[keep], entry]), np.concatenate([matrices[keep], [np.array(matrix)]]))
+
+# Remove the entry with the given kind and name from the library. Entries are looked up by name rather
+# than position, as another artist may have saved to the library since the search popup was shown
+def library_remove(path, kind, name):
+    index, matrices = load_library(path)
+    found = library_match(index, kind, name)
+    if not found.any():
+        raise ValueError("That entry is no longer in the library")
+    index = np.array(index[~found])
+    matrices = np.array(matrices[~found])
+    save_library(path, index, matrices)
+
+# Return the library entry with the given kind and name as its matrix
+def library_entry(path, kind, name):
+    index, matrices = load_library(path)
+    found = np.flatnonzero(library_match(index, kind, name))
+    if not len(found):
+        raise ValueError("That entry is no longer in the library")
+    return Matrix(matrices[found[0]].tolist())
+
+# Search items for the library operators, kept in a global so Blender can hold on to the strings
+def library_items(self, context):
+    
+    global NB_library_items
+    
+    try:
+        index, matrices = load_library(library_path(context))
+    except (OSError, ValueError):
+        index = []
+    
+    # Items are identified by kind and name, and their number is derived from those too, so an entry
+    # picked in the popup stays the same entry even if the library changes on disk before execute
+    NB_library_items = []
+    for entry in index:
+        kind = NB_LIBRARY_KINDS[entry['kind']]
+        name = entry['name'].decode('utf-8', 'replace')
+        identifier = f'{kind}:{name}'
+        label = f'{name} (Relative)' if kind == 'RELATIVE' else name
+        NB_library_items.append((identifier, label, '', 'CON_CHILDOF' if kind == 'RELATIVE' else 'OBJECT_ORIGIN',
+                                 zlib.crc32(identifier.encode('utf-8')) & 0x7fffffff))
+    return NB_library_items
+
+
 ##### CLASSES #####
 class NBASProperties(bpy.types.PropertyGroup):
     
@@ -327,6 +1694,17 @@ class NBASProperties(bpy.types.PropertyGroup):
         description = "If enabled, will allow only one constraint to be active at a time", 
         default = True)
         
+    sticky_key : bpy.props.BoolProperty(
+        name = "Sticky_key", 
+        description = "If enabled, pinned items are keyed whenever sticky mode snaps them back, except during playback", 
+        default = False)
+        
+    library_path : bpy.props.StringProperty(
+        name = "Library", 
+        description = "Transform library file shared between sessions and artists.\nLeave empty to use the one in your Blender config folder", 
+        default = "",
+        subtype = 'FILE_PATH')
+        
 class NB_Absolute_Snap_ui(bpy.types.Panel):
     bl_space_type = 'VIEW_3D'
     bl_region_type = 'UI'
@@ -365,6 +1743,15 @@ class NB_Absolute_Snap_ui(bpy.types.Panel):
                 eval_row2.alert = True
                 eval_row2.label(text=NB_eval_message, icon="BLANK1")
         
+        audit_row = layout.row()
+        if NB_audit_ready:
+            count = audit_count()
+            audit_row.alert = bool(count)
+            audit_row.operator(AUDIT_FILE.bl_idname, text=f'{count} unsafe in file' if count else 'File evaluates safely',
+                               icon="ERROR" if count else "CHECKMARK")
+        else:
+            audit_row.operator(AUDIT_FILE.bl_idname, icon="VIEWZOOM")
+        
         copypaste_row = layout.row()
         copypaste_row.operator(COPY_XFORM.bl_idname, icon="DUPLICATE")
         copypaste_row.operator(PASTE_XFORM.bl_idname, icon="BRUSH_DATA")
@@ -384,6 +1771,23 @@ class NB_Absolute_Snap_ui(bpy.types.Panel):
         right = relative_row.operator(PASTE_RELATIVE.bl_idname, text='', icon="FORWARD")
         right.paste_direction = 1
         
+        sticky_row = layout.row(align=True)
+        pinned = owner_key(obj) in NB_sticky
+        sticky_row.operator(STICKY_TOGGLE.bl_idname, icon="PINNED" if pinned else "UNPINNED", depress=pinned)
+        sticky_row.prop(mytool, "sticky_key", text="", icon="KEY_HLT")
+        if NB_sticky:
+            clear = sticky_row.operator(STICKY_TOGGLE.bl_idname, text='', icon="X")
+            clear.clear = True
+        
+        transfer_row = layout.row()
+        transfer_row.operator(TRANSFER_POSE.bl_idname, icon="ARMATURE_DATA")
+        
+        library_row = layout.row(align=True)
+        library_row.operator(LIBRARY_STORE.bl_idname, text='Save', icon="BOOKMARKS")
+        library_row.operator(LIBRARY_APPLY.bl_idname, text='Apply', icon="IMPORT")
+        library_row.operator(LIBRARY_REMOVE.bl_idname, text='', icon="TRASH")
+        library_row.prop(mytool, "library_path", text="")
+        
         constraint_box = layout.box()
         coc = False
         for con in obj.constraints:
@@ -452,6 +1856,10 @@ class NB_Absolute_Snap_ui(bpy.types.Panel):
             split.operator(UNKEY_ALL.bl_idname, icon="KEY_DEHLT")
             split.prop(mytool, "snap_checkbox", text="", icon="SNAP_ON") 
             
+            fix_row = constraint_box.row()
+            fix_row.operator(COMPENSATE_SWITCHES.bl_idname, icon="FILE_REFRESH")
+            fix_row.operator(BAKE_DOWN.bl_idname, icon="REC")
+            
             options_row = constraint_box.row()
             options_row.prop(mytool, "name_checkbox", text="Name") 
             options_row.prop(mytool, "link_checkbox", text="Link") 
@@ -598,10 +2006,7 @@ class COPY_RELATIVE(bpy.types.Operator):
         
         x, child, child_armature, bone = get_selection(context)
             
-        if bone:
-            child_matrix = child_armature.matrix_world @ child.matrix
-        else:
-            child_matrix = child.matrix_world.copy()
+        child_matrix = world_matrix(child)
             
         NB_relative = parent_matrix.inverted() @ child_matrix
         return {'FINISHED'}
@@ -616,6 +2021,8 @@ class PASTE_RELATIVE(bpy.types.Operator):
     bake : bpy.props.BoolProperty(default=False, options={'HIDDEN'})
     frame_current : bpy.props.IntProperty(default=0, options={'HIDDEN'})
     
+    scratch = None # Keys of a frame by frame bake, written in one go when it's done
+    
     @classmethod
     def poll(self, context):
         parent, child, child_armature, bone = get_selection(context)
@@ -645,7 +2052,10 @@ class PASTE_RELATIVE(bpy.types.Operator):
         
         if bpy.context.scene.tool_settings.use_keyframe_insert_auto == True or self.bake:
             x, child, y, z = get_selection(context)
-            key_object(child)
+            if self.bake and self.scratch is not None:
+                buffer_pose(self.scratch, child, bpy.context.scene.frame_current)
+            else:
+                key_object(child)
             
         return {'FINISHED'}
     
@@ -657,6 +2067,33 @@ class PASTE_RELATIVE(bpy.types.Operator):
             self.frame_current = bpy.context.scene.frame_current
             frame_current_reference = self.frame_current
             frame_end = bpy.context.scene.frame_end 
+            
+            parent, child, child_armature, bone = get_selection(context)
+            issues = audit_issues(child)
+            if issues:
+                self.report({'ERROR'}, f"Evaluation error on {child.name} - {issues[0][0]}: {issues[0][1]}")
+                return {'CANCELLED'}
+            if not bone or full_inherit(child):
+                if self.paste_direction == -1:
+                    frames = range(frame_start, frame_current_reference + 1)
+                elif self.paste_direction == 1:
+                    frames = range(frame_current_reference, frame_end + 1)
+                else:
+                    frames = range(frame_start, frame_end + 1)
+                frames = list(frames)
+                dirty = rebake_frames(parent, child, frames)
+                if dirty:
+                    bake_relative(context, parent, child, child_armature, bone, dirty)
+                    store_bake_fingerprint(parent, child, frames)
+                else:
+                    self.report({'INFO'}, "Nothing changed since the last bake")
+                self.paste_direction = 0
+                refresh_anim()
+                return {'FINISHED'}
+            
+            # Bones that don't fully inherit from their parent are stepped through frame by frame,
+            # still collecting the keys in a scratch buffer rather than keying the live action
+            self.scratch = {}
             if self.paste_direction == -1:    
                 while self.frame_current > frame_start + 1:
                     self.execute(context)
@@ -669,12 +2106,334 @@ class PASTE_RELATIVE(bpy.types.Operator):
             bpy.context.scene.frame_set(frame_current_reference) 
             self.paste_direction = 0 
             self.execute(context)
+            commit_keys(self.scratch)
+            self.scratch = None
+            bpy.context.scene.frame_set(frame_current_reference)
+            refresh_anim()
         else:
             self.bake = False
             self.execute(context)
         
         return {'FINISHED'}
     
+class COMPENSATE_SWITCHES(bpy.types.Operator):
+    bl_idname = "absolutesnap.compensateswitches"
+    bl_description = "Find every frame where the active constraint changes and key the transform on it and the frame before\nso the world position stays the same across each switch"
+    bl_label = "Fix Switches"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    @classmethod
+    def poll(self, context):
+        return active_check(context)
+
+    def execute(self, context):
+        
+        object = context.active_object
+        armature = ''
+        bone = False
+        if object_in_posemode(object):
+            bone = True
+            armature = object
+            object = context.active_pose_bone 
+        
+        issues = audit_issues(object)
+        if issues:
+            self.report({'ERROR'}, f"Evaluation error - {issues[0][0]}: {issues[0][1]}")
+            return {'CANCELLED'}
+        
+        frames = switch_frames(object)
+        if not frames:
+            self.report({'INFO'}, "No constraint switches found")
+            return {'CANCELLED'}
+        
+        skipped = compensate_switches(context, object, armature, bone, frames)
+        if skipped:
+            self.report({'WARNING'}, f"Evaluation not safe, skipped switches on frames {', '.join(str(frame) for frame in skipped)}")
+        else:
+            self.report({'INFO'}, f"Compensated {len(frames)} switches")
+        refresh_anim()
+        return {'FINISHED'}
+    
+class BAKE_DOWN(bpy.types.Operator):
+    bl_idname = "absolutesnap.bakedown"
+    bl_description = "Bake the world space motion of the selection into plain keys and remove or mute its Child Of constraints"
+    bl_label = "Bake Down"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    frame_start : bpy.props.IntProperty(name="Start", default=1)
+    frame_end : bpy.props.IntProperty(name="End", default=250)
+    remove : bpy.props.BoolProperty(name="Remove Constraints", description="Remove the Child Of constraints and their influence curves instead of muting them", default=True)
+    
+    @classmethod
+    def poll(self, context):
+        return active_check(context)
+    
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        
+        object = context.active_object
+        if object_in_posemode(object):
+            selection = list(context.selected_pose_bones)
+        else:
+            selection = [obj for obj in context.selected_objects if not object_in_posemode(obj)]
+        
+        owners = []
+        skipped = []
+        for owner in selection:
+            if not any(valid_constraint(con) for con in owner.constraints):
+                continue
+            if isinstance(owner, bpy.types.PoseBone) and not full_inherit(owner):
+                skipped.append(owner.name)
+            else:
+                owners.append(owner)
+        if not owners:
+            self.report({'ERROR'}, "Nothing with Child Of constraints to bake")
+            return {'CANCELLED'}
+        
+        frames = list(range(self.frame_start, self.frame_end + 1))
+        if not frames:
+            self.report({'ERROR'}, "Frame range is empty")
+            return {'CANCELLED'}
+        bake_down(context, owners, frames, self.remove)
+        
+        others = [owner.name for owner in owners if any(con.type != 'CHILD_OF' and con.enabled for con in owner.constraints)]
+        if skipped:
+            self.report({'WARNING'}, f"Skipped bones that don't fully inherit from their parent: {', '.join(skipped)}")
+        if others:
+            self.report({'WARNING'}, f"Other constraints still move {', '.join(others)}, their motion won't match")
+        refresh_anim()
+        return {'FINISHED'}
+    
+class AUDIT_FILE(bpy.types.Operator):
+    bl_idname = "absolutesnap.auditfile"
+    bl_description = "Scan every object and bone in the file for Child Of constraints that can't be evaluated safely"
+    bl_label = "Audit File"
+    
+    def execute(self, context):
+        
+        audit_reset()
+        count = audit_count()
+        if not count:
+            self.report({'INFO'}, "All Child Of constraints evaluate safely")
+            return {'FINISHED'}
+        
+        lines = []
+        for key, entries in sorted(NB_audit.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+            name = bpy.data.objects[key].name_full
+            for bone, issues in sorted(entries.items()):
+                for con_name, reason in issues:
+                    owner = f'{name} > {bone}' if bone else name
+                    lines.append(f'{owner} > {con_name}: {reason}')
+        
+        def draw(menu, context):
+            for line in lines[:NB_audit_lines]:
+                menu.layout.label(text=line, icon="ERROR")
+            if len(lines) > NB_audit_lines:
+                menu.layout.label(text=f'... and {len(lines) - NB_audit_lines} more', icon="BLANK1")
+        
+        context.window_manager.popup_menu(draw, title=f"{count} unsafe constraints", icon="ERROR")
+        return {'FINISHED'}
+    
+class STICKY_TOGGLE(bpy.types.Operator):
+    bl_idname = "absolutesnap.stickytoggle"
+    bl_description = "Pin the selection in world space, snapping it back whenever its parents or Child Of targets move.\nUnpins the selection if it's already pinned"
+    bl_label = "Sticky"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    clear : bpy.props.BoolProperty(default=False, options={'HIDDEN'})
+    
+    @classmethod
+    def poll(self, context):
+        return active_check(context) or bool(NB_sticky)
+    
+    @classmethod
+    def description(cls, context, properties):
+        if properties.clear:
+            return 'Unpin everything'
+
+    def execute(self, context):
+        
+        if self.clear:
+            sticky_clear()
+            return {'FINISHED'}
+        
+        object = context.active_object
+        if object_in_posemode(object):
+            owners = list(context.selected_pose_bones)
+        else:
+            owners = list(context.selected_objects)
+        
+        if owners and all(owner_key(owner) in NB_sticky for owner in owners):
+            for owner in owners:
+                NB_sticky.pop(owner_key(owner), None)
+            NB_sticky_queue.clear()
+        else:
+            for owner in owners:
+                sticky_pin(owner)
+        
+        sticky_handlers(bool(NB_sticky))
+        return {'FINISHED'}
+    
+class TRANSFER_POSE(bpy.types.Operator):
+    bl_idname = "absolutesnap.transferpose"
+    bl_description = "Transfer the world space animation of the selected armature onto the active one over a frame range.\nBones are matched by name, or by the \"source = target\" lines of a text"
+    bl_label = "Transfer Pose"
+    bl_options = {"REGISTER", "UNDO"}
+    
+    mapping : bpy.props.StringProperty(name="Mapping", description="Text with one \"source bone = target bone\" line per bone. Leave empty to match bones by name", default='')
+    frame_start : bpy.props.IntProperty(name="Start", default=1)
+    frame_end : bpy.props.IntProperty(name="End", default=250)
+    keep_offset : bpy.props.BoolProperty(name="Keep Offset", description="Keep the offset between the bones at the current frame, like Relative does", default=True)
+    
+    @classmethod
+    def poll(self, context):
+        target = context.active_object
+        sources = [obj for obj in context.selected_objects if obj.type == 'ARMATURE' and obj != target]
+        return target is not None and target.type == 'ARMATURE' and len(sources) == 1
+    
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.prop_search(self, "mapping", bpy.data, "texts")
+        row = layout.row(align=True)
+        row.prop(self, "frame_start")
+        row.prop(self, "frame_end")
+        layout.prop(self, "keep_offset")
+
+    def execute(self, context):
+        
+        target = context.active_object
+        source = [obj for obj in context.selected_objects if obj.type == 'ARMATURE' and obj != target][0]
+        text = bpy.data.texts.get(self.mapping) if self.mapping else None
+        if self.mapping and text is None:
+            self.report({'ERROR'}, f"Mapping text '{self.mapping}' not found")
+            return {'CANCELLED'}
+        
+        pairs = []
+        skipped = []
+        unsafe = []
+        for source_name, target_name in bone_mapping(text, source, target):
+            if audit_issues(target.pose.bones[target_name]):
+                unsafe.append(target_name)
+            elif full_inherit(target.pose.bones[target_name]):
+                pairs.append((source_name, target_name))
+            else:
+                skipped.append(target_name)
+        if not pairs:
+            self.report({'ERROR'}, "No bones to transfer")
+            return {'CANCELLED'}
+        
+        frames = list(range(self.frame_start, self.frame_end + 1))
+        if not frames:
+            self.report({'ERROR'}, "Frame range is empty")
+            return {'CANCELLED'}
+        transfer_pose(context, source, target, pairs, frames, self.keep_offset)
+        
+        if unsafe:
+            self.report({'WARNING'}, f"Skipped bones with unsafe constraints: {', '.join(unsafe)}")
+        if skipped:
+            self.report({'WARNING'}, f"Skipped bones that don't fully inherit from their parent: {', '.join(skipped)}")
+        refresh_anim()
+        return {'FINISHED'}
+    
+class LIBRARY_STORE(bpy.types.Operator):
+    bl_idname = "absolutesnap.librarystore"
+    bl_description = "Save the copied transform or relationship to the transform library"
+    bl_label = "Save to Library"
+    
+    name : bpy.props.StringProperty(name="Name", default='')
+    kind : bpy.props.EnumProperty(
+        name = "Save",
+        items = (('POSE', "Copied transform", "The world space transform copied with Copy"),
+                 ('RELATIVE', "Copied relationship", "The relationship copied with Relative")))
+    
+    @classmethod
+    def poll(self, context):
+        return bool(NB_matrix) or bool(NB_relative)
+    
+    def invoke(self, context, event):
+        self.kind = 'POSE' if NB_matrix else 'RELATIVE'
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        matrix = NB_matrix if self.kind == 'POSE' else NB_relative
+        if not matrix:
+            self.report({'ERROR'}, "Nothing copied to save")
+            return {'CANCELLED'}
+        if not self.name:
+            self.report({'ERROR'}, "Name required")
+            return {'CANCELLED'}
+        try:
+            library_store(library_path(context), self.name, self.kind, matrix)
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+    
+class LIBRARY_APPLY(bpy.types.Operator):
+    bl_idname = "absolutesnap.libraryapply"
+    bl_description = "Paste a saved transform or relationship from the transform library onto the selection"
+    bl_label = "Apply from Library"
+    bl_options = {"REGISTER", "UNDO"}
+    bl_property = "entry"
+    
+    entry : bpy.props.EnumProperty(items=library_items)
+    
+    @classmethod
+    def poll(self, context):
+        return active_check(context)
+    
+    def invoke(self, context, event):
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        global NB_matrix, NB_relative
+        kind, name = library_item_key(self.entry)
+        try:
+            matrix = library_entry(library_path(context), kind, name)
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        
+        if kind == 'POSE':
+            NB_matrix = matrix
+            if bpy.ops.absolutesnap.pastexform.poll():
+                bpy.ops.absolutesnap.pastexform()
+        else:
+            NB_relative = matrix
+            if bpy.ops.absolutesnap.pasterelative.poll():
+                bpy.ops.absolutesnap.pasterelative('EXEC_DEFAULT')
+        return {'FINISHED'}
+    
+class LIBRARY_REMOVE(bpy.types.Operator):
+    bl_idname = "absolutesnap.libraryremove"
+    bl_description = "Remove a saved transform or relationship from the transform library"
+    bl_label = "Remove from Library"
+    bl_property = "entry"
+    
+    entry : bpy.props.EnumProperty(items=library_items)
+    
+    def invoke(self, context, event):
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            library_remove(library_path(context), *library_item_key(self.entry))
+        except (OSError, ValueError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+    
 class TOGGLE_CONSTRAINT(bpy.types.Operator):
     bl_idname = "absolutesnap.toggleconstraint"
     bl_description = "Toggle"
@@ -885,17 +2644,33 @@ classes = (NB_Absolute_Snap_ui,
             PASTE_XFORM, 
             SNAP_SELECTED,
             COPY_RELATIVE,
-            PASTE_RELATIVE)
+            PASTE_RELATIVE,
+            COMPENSATE_SWITCHES,
+            BAKE_DOWN,
+            AUDIT_FILE,
+            STICKY_TOGGLE,
+            TRANSFER_POSE,
+            LIBRARY_STORE,
+            LIBRARY_APPLY,
+            LIBRARY_REMOVE)
 
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     bpy.utils.register_class(NBASProperties)
     bpy.types.Scene.my_tool = bpy.props.PointerProperty(type=NBASProperties)
+    bpy.app.handlers.load_post.append(load_handler)
+    bpy.app.handlers.depsgraph_update_post.append(audit_depsgraph_handler)
 
 def unregister():
     for cls in classes:
         bpy.utils.unregister_class(cls)   
+    if load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_handler)
+    if audit_depsgraph_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(audit_depsgraph_handler)
+    sticky_clear()
+    audit_reset()
     del bpy.types.Scene.my_tool
 
 if __name__ == "__main__":